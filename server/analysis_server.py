@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Audio Analysis HTTP worker for PitchPal
+Keeps the Whisper model and openSMILE extractor loaded between requests
+
+Run with: uvicorn analysis_server:app --port 8001 --workers 2
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+
+import ctranslate2
+from fastapi import FastAPI, File, UploadFile
+from fastapi.responses import Response
+
+from analyze_audio import analyze, dumps_result
+
+app = FastAPI(title="PitchPal Audio Analysis")
+
+# The server's own logs share stdout/stderr with the models, so rather than silencing
+# the descriptors (as the CLI does) keep the model libraries at warning level
+logging.getLogger("faster_whisper").setLevel(logging.WARNING)
+ctranslate2.set_log_level(logging.WARNING)
+
+@app.get("/health")
+def health():
+    return {"status": "OK"}
+
+@app.post("/analyze")
+def analyze_upload(audio: UploadFile = File(...)) -> Response:
+    """
+    Analyze an uploaded audio file and return the same JSON as analyze_audio.py
+    """
+    suffix = os.path.splitext(audio.filename or "")[1]
+    # The directory and the upload inside it are removed on exit, even if analysis raises
+    with tempfile.TemporaryDirectory(prefix="pitchpal-") as temp_dir:
+        upload_path = os.path.join(temp_dir, "upload" + suffix)
+        fd = os.open(upload_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as upload_file:
+            shutil.copyfileobj(audio.file, upload_file)
+        result = analyze(upload_path)
+
+    return Response(
+        content=dumps_result(result),
+        media_type="application/json",
+        status_code=200 if result["success"] else 500,
+    )
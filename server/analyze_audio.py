@@ -1,129 +1,506 @@
 #!/usr/bin/env python3
 """
 Audio Analysis Script for PitchPal
-Uses OpenAI Whisper for transcription and pyOpenSMILE for prosodic feature extraction
+Uses faster-whisper (CTranslate2 Whisper) for transcription and pyOpenSMILE for prosodic feature extraction
 """
 
 import sys
 import json
 import os
-import tempfile
+import contextlib
+import re
+import threading
 import subprocess
 import warnings
-from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 
 # Suppress warnings to keep stdout clean for JSON output
 warnings.filterwarnings("ignore")
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'  # Suppress TensorFlow warnings
 
-# Import required libraries
+# Import required libraries. Decoder, spectral and fallback-only packages (av, soxr,
+# scipy.fft, numba, librosa) are imported where they are used, keeping them (and their
+# import time) off startup for callers that never reach them.
 try:
-    import whisper
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+    import ctranslate2
     import opensmile
     import numpy as np
-    import librosa
     import soundfile as sf
+    import orjson
 except ImportError as e:
     print(json.dumps({
         "error": f"Required library not installed: {str(e)}",
-        "message": "Please install missing dependencies: pip install openai-whisper opensmile librosa soundfile",
+        "message": "Please install missing dependencies: pip install faster-whisper opensmile librosa soundfile soxr av scipy numba orjson",
         "success": False
     }))
     sys.exit(1)
 
-def convert_webm_to_wav(input_path: str) -> str:
+# Every extractor works on 16 kHz mono audio (Whisper's native rate, and ample for
+# the prosodic features), so uploads are resampled to this once at decode time
+TARGET_SAMPLE_RATE = 16000
+
+# Whisper model size. When set (e.g. "tiny", "small") every file uses it; otherwise the
+# size is picked per file from the audio duration (see whisper_model_for_duration)
+WHISPER_MODEL_NAME = os.environ.get('PITCHPAL_WHISPER_MODEL')
+
+# Spoken language, if known in advance (e.g. "en"). English switches the size ladder to the
+# English-only ".en" checkpoints and skips language detection; unset means auto-detect.
+WHISPER_LANGUAGE = os.environ.get('PITCHPAL_WHISPER_LANGUAGE') or None
+
+# CPU threads each native thread pool (CTranslate2, the FFT) may use; 0 means all cores.
+# The Node worker pool sets this so its processes share the machine instead of each
+# claiming every core.
+CPU_THREADS = int(os.environ.get('PITCHPAL_CPU_THREADS', '0'))
+
+# Number of 30 s windows decoded together in one batched forward pass
+WHISPER_BATCH_SIZE = int(os.environ.get('PITCHPAL_WHISPER_BATCH_SIZE', '16'))
+
+# Pick the Whisper device explicitly rather than relying on device="auto": float16
+# weights and activations on a GPU (tensor cores), int8 weights on CPU
+_WHISPER_DEVICE = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+_WHISPER_COMPUTE_TYPE = "float16" if _WHISPER_DEVICE == "cuda" else "int8"
+
+# Most Whisper sizes kept loaded at once; the least recently used is dropped beyond this.
+# Defaults to one on a GPU so a worker never holds several sizes in device memory.
+WHISPER_MAX_MODELS = int(os.environ.get(
+    'PITCHPAL_WHISPER_MAX_MODELS', '1' if _WHISPER_DEVICE == "cuda" else '2'
+))
+
+def whisper_model_for_duration(duration_s: float) -> str:
     """
-    Convert WebM file to WAV using subprocess and FFmpeg if available,
-    or try to load directly with librosa
+    Choose the Whisper size for a recording: tiny for short pitches, base for typical
+    sessions, small for long ones where the extra accuracy is worth the compute
     """
-    import tempfile
+    if WHISPER_MODEL_NAME:
+        return WHISPER_MODEL_NAME
     
-    # Try to convert using FFmpeg first
-    try:
-        # Create temporary WAV file
-        temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_wav.close()
-        
-        # Try FFmpeg conversion
-        result = subprocess.run([
-            'ffmpeg', '-i', input_path, '-acodec', 'pcm_s16le', 
-            '-ar', '16000', '-ac', '1', '-y', temp_wav.name
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return temp_wav.name
+    if duration_s < 60:
+        name = "tiny"
+    elif duration_s < 600:
+        name = "base"
+    else:
+        name = "small"
+    return f"{name}.en" if WHISPER_LANGUAGE == "en" else name
+
+# Engines are loaded lazily on first use and reused for every later file; Whisper
+# pipelines (each holding its model) are cached per size, up to WHISPER_MAX_MODELS.
+# The lock keeps concurrent first calls (e.g. from the extractor thread pool) from
+# loading twice.
+_ENGINE_LOCK = threading.Lock()
+_WHISPER_PIPELINES: "OrderedDict[str, Any]" = OrderedDict()
+
+def _load_whisper_model(model_name: str):
+    """
+    Load the Whisper model of the given size
+    """
+    # A single CTranslate2 worker: throughput comes from batching windows in
+    # BatchedInferencePipeline rather than from concurrent transcribe() calls
+    return WhisperModel(
+        model_name,
+        device=_WHISPER_DEVICE,
+        compute_type=_WHISPER_COMPUTE_TYPE,
+        cpu_threads=CPU_THREADS,
+        num_workers=1,
+    )
+
+def _get_whisper_pipeline(model_name: str):
+    """
+    Return the cached batched pipeline for the Whisper model of the given size,
+    loading it on first call and evicting the least recently used size if over the cap
+    """
+    with _ENGINE_LOCK:
+        pipeline = _WHISPER_PIPELINES.get(model_name)
+        if pipeline is None:
+            # Drop the evicted models before loading, so peak memory stays at the cap;
+            # a transcription still using one keeps it alive until it finishes
+            while len(_WHISPER_PIPELINES) >= max(WHISPER_MAX_MODELS, 1):
+                _WHISPER_PIPELINES.popitem(last=False)
+            pipeline = _WHISPER_PIPELINES[model_name] = BatchedInferencePipeline(
+                model=_load_whisper_model(model_name)
+            )
         else:
-            os.unlink(temp_wav.name)
-            raise Exception(f"FFmpeg conversion failed: {result.stderr}")
-            
-    except Exception as e:
-        # Fallback: try to load with librosa and save as WAV
+            _WHISPER_PIPELINES.move_to_end(model_name)
+        return pipeline
+
+def semitones_to_hz(semitones: float) -> float:
+    """
+    Convert an eGeMAPS F0 value (semitones above 27.5 Hz) to Hz
+    """
+    return 27.5 * 2 ** (semitones / 12)
+
+# openSMILE extractor, built once so its config is only parsed on first use
+_SMILE = None
+
+def get_smile():
+    """
+    Return the cached openSMILE extractor, creating it on first call
+    """
+    global _SMILE
+    with _ENGINE_LOCK:
+        if _SMILE is None:
+            # eGeMAPS (88 functionals) covers every feature we read; ComParE computes 6373
+            _SMILE = opensmile.Smile(
+                feature_set=opensmile.FeatureSet.eGeMAPSv02,
+                feature_level=opensmile.FeatureLevel.Functionals,
+            )
+        return _SMILE
+
+# eGeMAPS functionals read by extract_prosodic_features_with_opensmile, in unpack order
+EGEMAPS_FEATURE_COLUMNS = [
+    "F0semitoneFrom27.5Hz_sma3nz_amean",
+    "F0semitoneFrom27.5Hz_sma3nz_stddevNorm",
+    "F0semitoneFrom27.5Hz_sma3nz_percentile20.0",
+    "F0semitoneFrom27.5Hz_sma3nz_percentile80.0",
+    "jitterLocal_sma3nz_amean",
+    "loudness_sma3_amean",
+    "loudness_sma3_stddevNorm",
+    "loudness_sma3_pctlrange0-2",
+    "shimmerLocaldB_sma3nz_amean",
+    "HNRdBACF_sma3nz_amean",
+    "VoicedSegmentsPerSec",
+]
+
+# Positions of EGEMAPS_FEATURE_COLUMNS in openSMILE's output; the layout is fixed
+# for a feature set, so it is looked up once per process
+_FEATURE_COLUMN_INDEX = None
+
+def select_feature_columns(features) -> np.ndarray:
+    """
+    Gather the EGEMAPS_FEATURE_COLUMNS values from an openSMILE result in one step
+    """
+    global _FEATURE_COLUMN_INDEX
+    if features.empty:
+        return np.zeros(len(EGEMAPS_FEATURE_COLUMNS))
+    
+    if _FEATURE_COLUMN_INDEX is None:
+        index = features.columns.get_indexer(EGEMAPS_FEATURE_COLUMNS)
+        missing = [name for name, position in zip(EGEMAPS_FEATURE_COLUMNS, index) if position < 0]
+        if missing:
+            raise KeyError(f"openSMILE output is missing features: {', '.join(missing)}")
+        _FEATURE_COLUMN_INDEX = index
+    
+    return features.to_numpy()[0, _FEATURE_COLUMN_INDEX]
+
+def decode_to_float32(input_path: str, sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode any FFmpeg-readable file in-process with PyAV into mono float32 samples at sr
+    """
+    import av
+    
+    resampler = av.AudioResampler(format='flt', layout='mono', rate=sr)
+    chunks = []
+    with av.open(input_path) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        # Flush samples still buffered inside the resampler
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+# Reciprocal of the int16 full scale, kept in float32 so conversion is a single multiply
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
+def decode_with_ffmpeg(input_path: str, sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode with the FFmpeg CLI, streaming raw 16-bit PCM over a pipe instead of a temp file
+    """
+    with subprocess.Popen([
+        'ffmpeg', '-nostdin', '-i', input_path, '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ar', str(sr), '-ac', '1', 'pipe:1'
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1 << 20) as process:
+        pcm = process.stdout.read()
+    
+    if process.returncode != 0:
+        raise Exception(f"FFmpeg decode failed with exit code {process.returncode}")
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) * _INT16_SCALE
+
+def read_with_soundfile(input_path: str, sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Read with libsndfile straight to float32 and resample with soxr if needed
+    """
+    import soxr
+    
+    y, file_sr = sf.read(input_path, dtype='float32', always_2d=True)
+    y = y.mean(axis=1)
+    if file_sr != sr:
+        y = soxr.resample(y, file_sr, sr)
+    return y
+
+def is_16k_mono_pcm_wav(path: str, sr: int = TARGET_SAMPLE_RATE) -> bool:
+    """
+    Sniff the container header (not the extension) for PCM WAV already at the target rate, mono
+    """
+    try:
+        with sf.SoundFile(path) as f:
+            return f.format == "WAV" and f.samplerate == sr and f.channels == 1 and f.subtype.startswith("PCM")
+    except Exception:
+        # Not a container libsndfile understands (e.g. WebM/MP4), so it needs a full decode
+        return False
+
+def load_audio(file_path: str, sr: int = TARGET_SAMPLE_RATE):
+    """
+    Decode an audio file once into a mono float32 array shared by all extractors
+    """
+    # Already in the target format: read the samples as-is, no decoder or resampler
+    if is_16k_mono_pcm_wav(file_path, sr):
+        y, _ = sf.read(file_path, dtype='float32')
+        return np.ascontiguousarray(y, dtype=np.float32), sr
+    
+    try:
+        y = decode_to_float32(file_path, sr)
+    except Exception as decode_error:
+        print(f"Warning: PyAV decode failed, trying FFmpeg: {decode_error}", file=sys.stderr)
         try:
-            y, sr = librosa.load(input_path, sr=16000)
-            temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            temp_wav.close()
-            sf.write(temp_wav.name, y, sr)
-            return temp_wav.name
-        except Exception as fallback_error:
-            raise Exception(f"Both FFmpeg and librosa conversion failed: {str(e)}, {str(fallback_error)}")
+            y = decode_with_ffmpeg(file_path, sr)
+        except Exception as ffmpeg_error:
+            # Try to process the original file with libsndfile
+            print(f"Warning: FFmpeg decode failed, trying soundfile: {ffmpeg_error}", file=sys.stderr)
+            y = read_with_soundfile(file_path, sr)
+    
+    return np.ascontiguousarray(y, dtype=np.float32), sr
+
+def pad_to_frame(y: np.ndarray, frame_length: int = 2048) -> np.ndarray:
+    """
+    Zero-pad a signal shorter than one frame up to frame_length samples
+    """
+    if y.size < frame_length:
+        y = np.pad(y, (0, frame_length - y.size))
+    return y
+
+def frame_signal(y: np.ndarray, frame_length: int = 2048, hop_length: int = 512) -> np.ndarray:
+    """
+    Strided (n_frames, frame_length) view of the signal, zero-padded to at least one frame
+    """
+    y = pad_to_frame(y, frame_length)
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+
+def frame_rms(y: np.ndarray, frame_length: int = 2048, hop_length: int = 512) -> np.ndarray:
+    """
+    Per-frame RMS energy computed over a strided view of the signal (no copies)
+    """
+    frames = frame_signal(y, frame_length, hop_length)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_length)
+
+def _pitch_stats(f0):
+    """
+    Single-pass (mean, std, range, count) over the voiced (finite, > 0) pitch values;
+    compiled with numba by _get_pitch_stats
+    """
+    total = 0.0
+    total_sq = 0.0
+    highest = -1e30
+    lowest = 1e30
+    count = 0
+    for value in f0:
+        if value > 0 and np.isfinite(value):
+            total += value
+            total_sq += value * value
+            if value > highest:
+                highest = value
+            if value < lowest:
+                lowest = value
+            count += 1
+    if count == 0:
+        return 0.0, 0.0, 0.0, 0
+    mean = total / count
+    variance = max(total_sq / count - mean * mean, 0.0)
+    return mean, np.sqrt(variance), highest - lowest, count
+
+# JIT-compiled _pitch_stats, built on first use (only the librosa fallback needs it)
+_PITCH_STATS = None
+
+def _get_pitch_stats():
+    """
+    Return the numba-compiled _pitch_stats kernel, compiling (or loading it from the
+    on-disk cache) on first call
+    """
+    global _PITCH_STATS
+    if _PITCH_STATS is None:
+        from numba import njit
+        _PITCH_STATS = njit(cache=True)(_pitch_stats)
+    return _PITCH_STATS
+
+def zero_crossing_rate(y: np.ndarray) -> float:
+    """
+    Fraction of adjacent sample pairs whose sign differs
+    """
+    if y.size < 2:
+        return 0.0
+    sign = np.signbit(y)
+    return np.count_nonzero(sign[1:] ^ sign[:-1]) / (y.size - 1)
+
+# torch is optional; when a CUDA device is present the spectral path runs on
+# the GPU. None means "not probed yet", False means unavailable.
+_TORCH_CUDA = None
+_CUDA_WINDOWS = {}
+_HANN_WINDOWS = {}
+
+def _get_torch_cuda():
+    """
+    Return the torch module if it imports and CUDA is usable, else False
+    """
+    global _TORCH_CUDA
+    if _TORCH_CUDA is None:
+        try:
+            import torch
+            _TORCH_CUDA = torch if torch.cuda.is_available() else False
+        except ImportError:
+            _TORCH_CUDA = False
+    return _TORCH_CUDA
+
+def spectral_centroid(y: np.ndarray, sr: int, n_fft: int = 2048, hop_length: int = 512) -> np.ndarray:
+    """
+    Per-frame spectral centroid, on the GPU via torch when available. Both branches
+    use the same un-centred, zero-padded frames, so they agree on a given file.
+    """
+    torch = _get_torch_cuda()
+    if torch:
+        # Reuse the window tensor across calls so only the samples are copied to the device
+        window = _CUDA_WINDOWS.get(n_fft)
+        if window is None:
+            window = _CUDA_WINDOWS[n_fft] = torch.hann_window(n_fft, device="cuda")
+        waveform = torch.from_numpy(pad_to_frame(np.ascontiguousarray(y, dtype=np.float32), n_fft)).cuda()
+        S = torch.stft(
+            waveform, n_fft, hop_length=hop_length, win_length=n_fft, window=window,
+            center=False, return_complex=True,
+        ).abs()
+        freqs = torch.fft.rfftfreq(n_fft, 1.0 / sr, device="cuda")
+        # Silent frames have no energy; clamp like the CPU branch instead of dividing by zero
+        centroid = (freqs @ S) / S.sum(dim=0).clamp_min(1e-12)
+        return centroid.cpu().numpy()
+    
+    import scipy.fft
+    
+    window = _HANN_WINDOWS.get(n_fft)
+    if window is None:
+        # Periodic Hann window (what scipy.signal.get_window("hann") returns), built with
+        # NumPy so the expensive scipy.signal import stays out of startup
+        window = _HANN_WINDOWS[n_fft] = (
+            0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)
+        ).astype(np.float32)
+    
+    # Windowing copies the strided frames, so the FFT may overwrite that buffer;
+    # pocketfft spreads the frames across the CPU_THREADS budget (all cores by default)
+    frames = frame_signal(y, n_fft, hop_length) * window
+    with scipy.fft.set_workers(CPU_THREADS or -1):
+        spectrum = scipy.fft.rfft(frames, axis=-1, overwrite_x=True)
+    
+    # One (n_frames, n_bins) magnitude spectrogram shared by all spectral features
+    S = np.abs(spectrum)
+    freqs = scipy.fft.rfftfreq(n_fft, 1.0 / sr).astype(np.float32)
+    return (S @ freqs) / np.maximum(S.sum(axis=1), 1e-12)
+
+_WORD_RE = re.compile(r'\S+')
+
+def count_words(text: str) -> int:
+    """
+    Count whitespace-separated words without materializing the token list
+    """
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+def empty_segments() -> Dict[str, Any]:
+    """
+    Columnar segment container with no segments
+    """
+    return {
+        "start": np.empty(0, dtype=np.float64),
+        "end": np.empty(0, dtype=np.float64),
+        "text": [],
+        "confidence": np.empty(0, dtype=np.float64),
+    }
+
+def segment_records(segments: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Expand columnar segments into the per-segment dicts emitted in the JSON output
+    """
+    return [
+        {"start": start, "end": end, "text": text, "confidence": confidence}
+        for start, end, text, confidence in zip(
+            segments["start"].round(2).tolist(),
+            segments["end"].round(2).tolist(),
+            segments["text"],
+            segments["confidence"].round(3).tolist(),
+        )
+    ]
 
-def transcribe_audio_with_whisper(file_path: str) -> Dict[str, Any]:
+@contextlib.contextmanager
+def silence_fds():
     """
-    Transcribe audio using OpenAI Whisper
+    Point stdout and stderr at /dev/null at the file descriptor level, so output from
+    native code (CTranslate2, openSMILE) is discarded as well as Python prints
     """
-    converted_file = None
+    sys.stdout.flush()
+    sys.stderr.flush()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    old_out, old_err = os.dup(1), os.dup(2)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
     try:
-        # Convert WebM to WAV if needed
-        if file_path.lower().endswith('.webm'):
-            try:
-                converted_file = convert_webm_to_wav(file_path)
-                file_to_process = converted_file
-            except Exception as convert_error:
-                # Try to process the original file directly
-                file_to_process = file_path
-                print(f"Warning: WebM conversion failed, trying direct processing: {convert_error}", file=sys.stderr)
-        else:
-            file_to_process = file_path
-        
-        # Load Whisper model (base model for balance of speed and accuracy)
-        # Suppress all Whisper output by redirecting both stdout and stderr
-        import contextlib
-        import io
-        
-        # Capture both stdout and stderr to suppress all Whisper output
-        stdout_f = io.StringIO()
-        stderr_f = io.StringIO()
-        with contextlib.redirect_stdout(stdout_f), contextlib.redirect_stderr(stderr_f):
-            model = whisper.load_model("base")
-            
-            # Transcribe the audio with all output suppressed
-            result = model.transcribe(file_to_process, verbose=False)
+        yield
+    finally:
+        # Drop anything Python buffered meanwhile before the real streams come back
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(old_out, 1)
+        os.dup2(old_err, 2)
+        os.close(devnull)
+        os.close(old_out)
+        os.close(old_err)
+
+def transcribe_audio_with_whisper(y: np.ndarray, sr: int) -> Dict[str, Any]:
+    """
+    Transcribe audio using faster-whisper (expects 16 kHz mono samples)
+    """
+    try:
+        # Load (or reuse) the Whisper model sized for this recording's duration.
+        # In the CLI modes its console output is discarded by analyze (see silence_fds).
+        pipeline = _get_whisper_pipeline(whisper_model_for_duration(y.size / sr))
+        
+        # The VAD pre-filter skips silent stretches, and the voiced 30 s windows are
+        # decoded greedily as one batch; batched windows never condition on previous text.
+        segments_iter, info = pipeline.transcribe(
+            y,
+            beam_size=1,
+            temperature=0.0,
+            language=WHISPER_LANGUAGE,
+            no_speech_threshold=0.6,
+            vad_filter=True,
+            batch_size=WHISPER_BATCH_SIZE,
+        )
+        raw_segments = [
+            (segment.start, segment.end, segment.text, segment.avg_logprob)
+            for segment in segments_iter
+        ]
+        
+        text = "".join(seg_text for _, _, seg_text, _ in raw_segments)
         
         # Calculate speaking rate
-        duration = result.get("duration", 0)
-        word_count = len(result["text"].split()) if result["text"] else 0
+        duration = info.duration
+        word_count = count_words(text)
         speaking_rate = (word_count / duration) * 60 if duration > 0 else 0  # words per minute
         
-        # Extract segments with timing
-        segments = []
-        if "segments" in result:
-            for segment in result["segments"]:
-                segments.append({
-                    "start": round(segment.get("start", 0), 2),
-                    "end": round(segment.get("end", 0), 2),
-                    "text": segment.get("text", "").strip(),
-                    "confidence": round(segment.get("avg_logprob", 0), 3) if "avg_logprob" in segment else None
-                })
+        # Extract segments with timing, stored column-wise
+        count = len(raw_segments)
+        segments = {
+            "start": np.fromiter((seg[0] for seg in raw_segments), dtype=np.float64, count=count),
+            "end": np.fromiter((seg[1] for seg in raw_segments), dtype=np.float64, count=count),
+            "text": [seg[2].strip() for seg in raw_segments],
+            "confidence": np.fromiter((seg[3] for seg in raw_segments), dtype=np.float64, count=count),
+        }
+        logprobs = segments["confidence"]
         
         return {
-            "transcript": result["text"].strip(),
-            "language": result.get("language", "unknown"),
+            "transcript": text.strip(),
+            "language": info.language,
             "duration": round(duration, 2),
             "word_count": word_count,
             "speaking_rate": round(speaking_rate, 1),
             "segments": segments,
-            "confidence": round(np.mean([s.get("avg_logprob", 0) for s in result.get("segments", [])]), 3) if result.get("segments") else None
+            "confidence": round(logprobs.mean(), 3) if logprobs.size else None
         }
         
     except Exception as e:
@@ -133,90 +510,79 @@ def transcribe_audio_with_whisper(file_path: str) -> Dict[str, Any]:
             "duration": 0,
             "word_count": 0,
             "speaking_rate": 0,
-            "segments": [],
+            "segments": empty_segments(),
             "confidence": None,
             "error": f"Whisper transcription failed: {str(e)}"
         }
-    finally:
-        # Clean up converted file if it was created
-        if converted_file and os.path.exists(converted_file):
-            try:
-                os.unlink(converted_file)
-            except:
-                pass
 
-def extract_prosodic_features_with_opensmile(file_path: str) -> Dict[str, Any]:
+def extract_prosodic_features_with_opensmile(y: np.ndarray, sr: int) -> Dict[str, Any]:
     """
     Extract prosodic features using pyOpenSMILE
     """
-    converted_file = None
     try:
-        # Convert WebM to WAV if needed for OpenSMILE
-        if file_path.lower().endswith('.webm'):
-            try:
-                converted_file = convert_webm_to_wav(file_path)
-                file_to_process = converted_file
-            except Exception as convert_error:
-                # Try to process the original file directly
-                file_to_process = file_path
-                print(f"Warning: WebM conversion failed for OpenSMILE, trying direct processing: {convert_error}", file=sys.stderr)
-        else:
-            file_to_process = file_path
+        # Get openSMILE with eGeMAPS feature set (in the CLI modes analyze silences its output)
+        smile = get_smile()
         
-        # Initialize openSMILE with ComParE feature set (suppress output)
-        import contextlib
-        import io
+        # Extract features
+        features = smile.process_signal(y, sr)
         
-        f = io.StringIO()
-        with contextlib.redirect_stderr(f):
-            smile = opensmile.Smile(
-                feature_set=opensmile.FeatureSet.ComParE_2016,
-                feature_level=opensmile.FeatureLevel.Functionals,
-            )
-            
-            # Extract features
-            features = smile.process_file(file_to_process)
+        # Gather just the functionals we use, in EGEMAPS_FEATURE_COLUMNS order
+        (
+            f0_semitones, f0_std_norm, f0_p20_semitones, f0_p80_semitones,
+            jitter_local, loudness_mean, loudness_std_norm, loudness_range,
+            shimmer_local, hnr_mean, voiced_segments_per_sec,
+        ) = select_feature_columns(features).tolist()
         
-        # Convert to dict for easier handling
-        feature_dict = features.to_dict('records')[0] if not features.empty else {}
+        # eGeMAPS reports F0 in semitones relative to 27.5 Hz; convert back to Hz
+        f0_std_semitones = f0_std_norm * f0_semitones
+        pitch_mean = semitones_to_hz(f0_semitones) if f0_semitones > 0 else 0
         
-        # Extract key prosodic features (using correct ComParE_2016 feature names)
+        # eGeMAPS has no spectral centroid or RMS energy functionals, so derive those
+        # from the samples we already hold
+        rms = frame_rms(y)
+        
+        # Extract key prosodic features (using eGeMAPSv02 feature names)
         prosodic_features = {
             # Pitch features
-            "pitch_mean": feature_dict.get("F0final_sma_amean", 0),
-            "pitch_std": feature_dict.get("F0final_sma_stddev", 0),
-            "pitch_range": feature_dict.get("F0final_sma_range", 0),
+            "pitch_mean": pitch_mean,
+            # Semitone spread mapped to Hz around the mean (d Hz = Hz * ln 2 / 12 per semitone)
+            "pitch_std": pitch_mean * f0_std_semitones * np.log(2) / 12,
+            # 20th-80th percentile range, eGeMAPS carries no min/max
+            "pitch_range": (
+                semitones_to_hz(f0_p80_semitones) - semitones_to_hz(f0_p20_semitones)
+            ) if pitch_mean > 0 else 0,
             
             # Jitter (pitch stability)
-            "jitter_local": feature_dict.get("jitterLocal_sma_amean", 0),
-            "jitter_ddp": feature_dict.get("jitterDDP_sma_amean", 0),
+            "jitter_local": jitter_local,
             
-            # Loudness features (using RMS energy as proxy since ComParE doesn't have direct loudness)
-            "loudness_mean": feature_dict.get("pcm_RMSenergy_sma_amean", 0),
-            "loudness_std": feature_dict.get("pcm_RMSenergy_sma_stddev", 0),
-            "loudness_range": feature_dict.get("pcm_RMSenergy_sma_range", 0),
+            # Loudness features (perceptual loudness)
+            "loudness_mean": loudness_mean,
+            "loudness_std": loudness_std_norm * loudness_mean,
+            "loudness_range": loudness_range,
             
             # Shimmer (amplitude stability)
-            "shimmer_local": feature_dict.get("shimmerLocal_sma_amean", 0),
+            "shimmer_local": shimmer_local,
             
             # Voice quality
-            "hnr_mean": feature_dict.get("logHNR_sma_amean", 0),  # Harmonics-to-Noise Ratio
-            "spectral_centroid": feature_dict.get("pcm_fftMag_spectralCentroid_sma_amean", 0),
+            "hnr_mean": hnr_mean,  # Harmonics-to-Noise Ratio
+            "spectral_centroid": spectral_centroid(y, sr).mean(),
             
             # Temporal features
-            "voiced_segments_count": feature_dict.get("voicedSegmentsPerSec", 0),
+            "voiced_segments_count": voiced_segments_per_sec,
             
             # Energy features
-            "energy_mean": feature_dict.get("pcm_RMSenergy_sma_amean", 0),
-            "energy_std": feature_dict.get("pcm_RMSenergy_sma_stddev", 0),
+            "energy_mean": rms.mean(),
+            "energy_std": rms.std(),
         }
         
         # Calculate derived metrics
         prosodic_features["pitch_variability"] = prosodic_features["pitch_std"] / max(prosodic_features["pitch_mean"], 1)
-        prosodic_features["loudness_variability"] = prosodic_features["loudness_std"] / max(abs(prosodic_features["loudness_mean"]), 1)
-        # Adjust voice quality score calculation - HNR typically ranges from -20 to +20 dB
-        # Map -20 to 0 and +20 to 100, with 0 dB being 50
-        prosodic_features["voice_quality_score"] = max(0, min(100, (prosodic_features["hnr_mean"] + 20) * 2.5))
+        # Volume consistency is scored on RMS energy (as it was with ComParE's pcm_RMSenergy);
+        # eGeMAPS loudness is perceptual (sone-scale) and varies far more between frames
+        prosodic_features["loudness_variability"] = prosodic_features["energy_std"] / max(abs(prosodic_features["energy_mean"]), 1)
+        # HNRdBACF is a true dB ratio, around 0 dB for noise-like voicing and rarely above
+        # 20 dB for clean speech; map 0 dB to 0 and 20 dB to 100
+        prosodic_features["voice_quality_score"] = max(0, min(100, prosodic_features["hnr_mean"] * 5))
         
         return {
             **prosodic_features,
@@ -226,38 +592,43 @@ def extract_prosodic_features_with_opensmile(file_path: str) -> Dict[str, Any]:
     except Exception as e:
         # Fallback to basic librosa analysis if openSMILE fails
         try:
-            # Use converted file if available, otherwise original
-            fallback_file = converted_file if converted_file else file_path
-            y, sr = librosa.load(fallback_file, sr=None)
-            duration = librosa.get_duration(y=y, sr=sr)
+            # Keep every reduction below in float32 to avoid implicit float64 upcasts
+            y = np.ascontiguousarray(y, dtype=np.float32)
             
-            # Basic pitch extraction
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:
-                    pitch_values.append(pitch)
+            import librosa
             
+            # Basic pitch extraction
+            # pYIN marks unvoiced frames (silence, fricatives) as NaN, which _pitch_stats
+            # skips; plain YIN reports a pitch near fmax for them instead. Five pitch bins
+            # per semitone (resolution=0.2) keep the Viterbi decode cheap.
+            f0, _, _ = librosa.pyin(y, fmin=65, fmax=500, sr=sr, frame_length=2048, resolution=0.2)
+            pitch_mean, pitch_std, _, _ = _get_pitch_stats()(f0)
+            # 20th-80th percentile span, the same range eGeMAPS reports on the main path
+            voiced = f0[np.isfinite(f0)]
+            pitch_range = np.subtract(*np.percentile(voiced, [80, 20])) if voiced.size else 0.0
+
             # Basic features
-            rms = librosa.feature.rms(y=y)[0]
-            zcr = librosa.feature.zero_crossing_rate(y)[0]
-            
+            rms = frame_rms(y)
+            rms_mean = rms.mean(dtype=np.float32)
+            rms_std = rms.std(dtype=np.float32)
+            zcr = zero_crossing_rate(y)
+            centroid = spectral_centroid(y, sr)
+
             return {
-                "pitch_mean": float(np.mean(pitch_values)) if pitch_values else 0,
-                "pitch_std": float(np.std(pitch_values)) if pitch_values else 0,
-                "pitch_range": float(np.max(pitch_values) - np.min(pitch_values)) if pitch_values else 0,
-                "loudness_mean": float(np.mean(rms)),
-                "loudness_std": float(np.std(rms)),
-                "energy_mean": float(np.mean(rms)),
-                "energy_std": float(np.std(rms)),
+                "pitch_mean": pitch_mean,
+                "pitch_std": pitch_std,
+                "pitch_range": pitch_range,
+                "loudness_mean": rms_mean,
+                "loudness_std": rms_std,
+                "energy_mean": rms_mean,
+                "energy_std": rms_std,
                 "jitter_local": 0,  # Not available with librosa
                 "shimmer_local": 0,  # Not available with librosa
                 "hnr_mean": 0,  # Not available with librosa
-                "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))),
+                "spectral_centroid": centroid.mean(dtype=np.float32),
+                "zero_crossing_rate": zcr,
                 "pitch_variability": 0,
-                "loudness_variability": float(np.std(rms) / max(np.mean(rms), 0.001)),
+                "loudness_variability": rms_std / max(rms_mean, 0.001),
                 "voice_quality_score": 50,  # Default neutral score
                 "extraction_success": False,
                 "fallback_method": "librosa",
@@ -283,31 +654,18 @@ def extract_prosodic_features_with_opensmile(file_path: str) -> Dict[str, Any]:
                 "extraction_success": False,
                 "error": f"Both OpenSMILE and librosa failed: {str(e)}, {str(fallback_error)}"
             }
-    finally:
-        # Clean up converted file if it was created
-        if converted_file and os.path.exists(converted_file):
-            try:
-                os.unlink(converted_file)
-            except:
-                pass
 
 def calculate_speech_rate_from_transcript(transcript_data: Dict[str, Any]) -> float:
     """
     Calculate speech rate from transcript timing data
     """
     try:
-        segments = transcript_data.get("segments", [])
-        if not segments:
+        segments = transcript_data.get("segments")
+        if segments is None or not segments["text"]:
             return transcript_data.get("speaking_rate", 0)
         
-        total_speech_time = 0
-        total_words = 0
-        
-        for segment in segments:
-            duration = segment.get("end", 0) - segment.get("start", 0)
-            words = len(segment.get("text", "").split())
-            total_speech_time += duration
-            total_words += words
+        total_speech_time = float((segments["end"] - segments["start"]).sum())
+        total_words = sum(count_words(text) for text in segments["text"])
         
         return (total_words / total_speech_time) * 60 if total_speech_time > 0 else 0
         
@@ -319,29 +677,37 @@ def calculate_analysis_scores(features: Dict[str, Any], transcript: Dict[str, An
     Calculate overall analysis scores and recommendations based on features and transcript
     """
     try:
-        # Pitch variety score (0-100)
         pitch_range = features.get("pitch_range", 0)
         pitch_variability = features.get("pitch_variability", 0)
-        pitch_variety = min(100, (pitch_range / 200) * 50 + pitch_variability * 50)
-        
-        # Voice quality score based on HNR and jitter
         voice_quality = features.get("voice_quality_score", 50)
         jitter = features.get("jitter_local", 0)
+        loudness_variability = features.get("loudness_variability", 0)
+        speaking_rate = transcript.get("speaking_rate", 0)
+        # Without any transcribed words (failed transcription or no speech) there is no
+        # pace to judge, so it is left out rather than scored as 0 wpm
+        has_transcript = transcript.get("word_count", 0) > 0
+        
+        # Pitch variety score (0-100); pitch_range is the 20th-80th percentile span, which
+        # runs about a third of a full min-max F0 range, hence 75 Hz rather than 200 Hz
+        pitch_variety = min(100, (pitch_range / 75) * 50 + pitch_variability * 50)
+        
+        # Voice quality score based on HNR and jitter
         voice_stability = max(0, 100 - (jitter * 1000))  # Lower jitter = better stability
         
         # Volume/loudness consistency
-        loudness_variability = features.get("loudness_variability", 0)
         volume_consistency = max(0, 100 - (loudness_variability * 50))
         
-        # Speaking rate score
-        speaking_rate = transcript.get("speaking_rate", 0)
-        if 120 <= speaking_rate <= 180:
-            pace_score = 100 - abs(speaking_rate - 150) * 2
+        # Speaking rate score: gentler penalty inside the 120-180 wpm band
+        if has_transcript:
+            in_band = 120 <= speaking_rate <= 180
+            pace_score = max(0, 100 - abs(speaking_rate - 150) * (2 if in_band else 3))
+            component_scores = [pitch_variety, voice_quality, volume_consistency, pace_score]
         else:
-            pace_score = max(0, 100 - abs(speaking_rate - 150) * 3)
+            pace_score = None
+            component_scores = [pitch_variety, voice_quality, volume_consistency]
         
         # Overall score
-        overall_score = (pitch_variety + voice_quality + volume_consistency + pace_score) / 4
+        overall_score = sum(component_scores) / len(component_scores)
         
         # Generate recommendations
         recommendations = []
@@ -351,10 +717,11 @@ def calculate_analysis_scores(features: Dict[str, Any], transcript: Dict[str, An
             recommendations.append("Focus on clear vocal production and minimize voice strain")
         if volume_consistency < 70:
             recommendations.append("Work on maintaining consistent volume throughout your presentation")
-        if speaking_rate < 120:
-            recommendations.append("Consider speaking a bit faster to maintain energy and engagement")
-        elif speaking_rate > 180:
-            recommendations.append("Try slowing down slightly for better comprehension and clarity")
+        if has_transcript:
+            if speaking_rate < 120:
+                recommendations.append("Consider speaking a bit faster to maintain energy and engagement")
+            elif speaking_rate > 180:
+                recommendations.append("Try slowing down slightly for better comprehension and clarity")
         
         if not recommendations:
             recommendations.append("Excellent delivery! Your vocal patterns demonstrate good variety and clarity")
@@ -375,7 +742,7 @@ def calculate_analysis_scores(features: Dict[str, Any], transcript: Dict[str, An
             "pitch_variety": round(pitch_variety, 1),
             "voice_quality": round(voice_quality, 1),
             "volume_consistency": round(volume_consistency, 1),
-            "pace_score": round(pace_score, 1),
+            "pace_score": round(pace_score, 1) if pace_score is not None else None,
             "recommendations": recommendations,
             "strengths": strengths
         }
@@ -391,37 +758,29 @@ def calculate_analysis_scores(features: Dict[str, Any], transcript: Dict[str, An
             "strengths": []
         }
 
-def main():
+def analyze(file_path: str, silence_output: bool = False) -> Dict[str, Any]:
     """
-    Main function to analyze audio file and output JSON
+    Analyze an audio file and return the result in the JSON output format.
+    silence_output discards the models' console output at the file descriptor level;
+    only the command-line modes, which own the process's stdout, should set it.
     """
-    if len(sys.argv) != 2:
-        print(json.dumps({
-            "error": "Usage: python analyze_audio.py <audio_file_path>",
-            "success": False
-        }))
-        sys.exit(1)
-    
-    file_path = sys.argv[1]
-    
-    # Check if file exists
-    if not os.path.exists(file_path):
-        print(json.dumps({
-            "error": f"Audio file not found: {file_path}",
-            "success": False
-        }))
-        sys.exit(1)
-    
     try:
         # Get file info
         file_size = os.path.getsize(file_path)
         file_name = os.path.basename(file_path)
         
-        # Transcribe audio with Whisper
-        transcript_data = transcribe_audio_with_whisper(file_path)
+        # Decode once and share the samples between Whisper and OpenSMILE
+        y, sr = load_audio(file_path)
         
-        # Extract prosodic features with OpenSMILE
-        prosodic_features = extract_prosodic_features_with_opensmile(file_path)
+        # Transcribe with Whisper and extract prosodic features with OpenSMILE concurrently;
+        # both spend their time in native code that releases the GIL. File descriptors are
+        # process-wide, so the models' output is silenced once around both threads.
+        with silence_fds() if silence_output else contextlib.nullcontext():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                transcript_future = executor.submit(transcribe_audio_with_whisper, y, sr)
+                prosodic_future = executor.submit(extract_prosodic_features_with_opensmile, y, sr)
+                transcript_data = transcript_future.result()
+                prosodic_features = prosodic_future.result()
         
         # Calculate refined speech rate
         refined_speech_rate = calculate_speech_rate_from_transcript(transcript_data)
@@ -434,7 +793,7 @@ def main():
         analysis_scores = calculate_analysis_scores(prosodic_features, transcript_data)
         
         # Prepare result in the requested format
-        result = {
+        return {
             "transcript": transcript_data.get("transcript", ""),
             "features": {
                 "pitch": prosodic_features.get("pitch_mean", 0),
@@ -456,7 +815,9 @@ def main():
                 "duration": transcript_data.get("duration", 0),
                 "word_count": transcript_data.get("word_count", 0),
                 "confidence": transcript_data.get("confidence", None),
-                "segments": transcript_data.get("segments", [])
+                "segments": segment_records(transcript_data.get("segments", empty_segments())),
+                # Set when Whisper failed, so an empty transcript is not mistaken for silence
+                "error": transcript_data.get("error")
             },
             "metadata": {
                 "file_name": file_name,
@@ -467,11 +828,8 @@ def main():
             "success": True
         }
         
-        # Output JSON to stdout
-        print(json.dumps(result, indent=2))
-        
     except Exception as e:
-        print(json.dumps({
+        return {
             "transcript": "",
             "features": {
                 "pitch": 0,
@@ -486,8 +844,86 @@ def main():
                 "size": 0,
                 "path": file_path
             }
+        }
+
+def dumps_result(result: Dict[str, Any], indent: bool = False) -> bytes:
+    """
+    Serialize an analysis result; orjson handles the NumPy scalars in it directly.
+    Output is compact unless indent is set, since the usual reader is the Node server
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(result, option=option)
+
+def serve():
+    """
+    Persistent worker mode: read one audio file path per line on stdin and write
+    one JSON result per line on stdout, keeping the models loaded between files
+    """
+    # Load the engines before the first request arrives; only the Whisper size used for
+    # short pitches is preloaded, longer recordings load their size on first use
+    try:
+        with silence_fds():
+            get_smile()
+            _get_whisper_pipeline(whisper_model_for_duration(0))
+    except Exception as e:
+        print(f"Warning: engine preload failed, will retry per file: {e}", file=sys.stderr)
+    
+    for line in sys.stdin:
+        file_path = line.strip()
+        if not file_path:
+            continue
+        
+        if os.path.exists(file_path):
+            result = analyze(file_path, silence_output=True)
+        else:
+            result = {
+                "error": f"Audio file not found: {file_path}",
+                "success": False
+            }
+        
+        sys.stdout.buffer.write(dumps_result(result))
+        sys.stdout.buffer.flush()
+
+def main():
+    """
+    Main function to analyze audio file and output JSON
+    """
+    if len(sys.argv) != 2:
+        sys.stdout.buffer.write(dumps_result({
+            "error": "Usage: python analyze_audio.py <audio_file_path> | --serve | --device",
+            "success": False
         }))
         sys.exit(1)
+    
+    if sys.argv[1] == "--serve":
+        serve()
+        return
+    
+    # Report the Whisper device ("cuda" or "cpu") so the Node server can size its worker pool
+    if sys.argv[1] == "--device":
+        print(_WHISPER_DEVICE)
+        return
+    
+    file_path = sys.argv[1]
+    
+    # Check if file exists
+    if not os.path.exists(file_path):
+        sys.stdout.buffer.write(dumps_result({
+            "error": f"Audio file not found: {file_path}",
+            "success": False
+        }))
+        sys.exit(1)
+    
+    result = analyze(file_path, silence_output=True)
+    
+    # Output JSON to stdout, indented only for a person reading it in a terminal
+    sys.stdout.buffer.write(dumps_result(result, indent=sys.stdout.isatty()))
+    sys.stdout.buffer.flush()
+    
+    if not result["success"]:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,28 +1,26 @@
 #!/usr/bin/env python3
 
-import opensmile
 import sys
 
+from analyze_audio import get_smile
+
 def find_features(file_path, search_terms):
     try:
         print(f"Finding features in: {file_path}")
         
-        # Initialize openSMILE with ComParE feature set
-        smile = opensmile.Smile(
-            feature_set=opensmile.FeatureSet.ComParE_2016,
-            feature_level=opensmile.FeatureLevel.Functionals,
-        )
+        # Reuse the eGeMAPS extractor configured in analyze_audio.py
+        smile = get_smile()
         
         # Extract features
         features = smile.process_file(file_path)
-        feature_dict = features.to_dict('records')[0] if not features.empty else {}
+        feature_row = features.iloc[0] if not features.empty else {}
         
-        print(f"Total features: {len(feature_dict)}")
+        print(f"Total features: {len(feature_row)}")
         
         for search_term in search_terms:
             print(f"\n=== Features containing '{search_term}' ===")
             matches = []
-            for key, value in feature_dict.items():
+            for key, value in feature_row.items():
                 if search_term.lower() in key.lower():
                     matches.append((key, value))
             
@@ -2,7 +2,7 @@ import { Request, Response } from 'express';
 import multer from 'multer';
 import path from 'path';
 import fs from 'fs';
-import { spawn } from 'child_process';
+import { analysisScriptPath, runPythonAnalysis } from '../utils/pythonAnalysis';
 import { analyzePitchWithTextBasedAnalysis, validateOpenAIKey } from '../utils/textBasedAnalysis';
 import { analyzeWithAudioBasedAnalysis } from '../utils/audioBasedAnalysis';
 import { createDefaultAudioBasedAnalysis, createDefaultTextBasedAnalysis } from '../utils/analysisTypes';
@@ -92,7 +92,7 @@ export const analyzeAudio = async (req: Request, res: Response) => {
 
     // Run Python script to analyze the audio
     try {
-      const pythonScriptPath = path.join(__dirname, '../../analyze_audio.py');
+      const pythonScriptPath = analysisScriptPath;
 
       // Check if Python script exists
       if (!fs.existsSync(pythonScriptPath)) {
@@ -106,24 +106,8 @@ export const analyzeAudio = async (req: Request, res: Response) => {
 
       console.log(`Running Python analysis on: ${savedPath}`);
 
-      // Spawn Python process
-      const pythonProcess = spawn('python3', [pythonScriptPath, savedPath]);
-
-      let stdout = '';
-      let stderr = '';
-
-      // Capture stdout
-      pythonProcess.stdout.on('data', (data) => {
-        stdout += data.toString();
-      });
-
-      // Capture stderr
-      pythonProcess.stderr.on('data', (data) => {
-        stderr += data.toString();
-      });
-
-      // Handle process completion
-      pythonProcess.on('close', async (code) => {
+      // Run the Python analysis (HTTP worker or one-off process)
+      runPythonAnalysis(pythonScriptPath, savedPath).then(async ({ code, stdout, stderr }) => {
         // Helper function to clean up uploaded file
         const cleanupFile = () => {
           fs.unlink(savedPath, (unlinkError) => {
@@ -222,10 +206,7 @@ export const analyzeAudio = async (req: Request, res: Response) => {
             fallback: createDefaultAudioBasedAnalysis('', 'Invalid JSON output from analysis script')
           });
         }
-      });
-
-      // Handle process errors
-      pythonProcess.on('error', (error) => {
+      }, (error) => {
         console.error('Failed to start Python process:', error);
         // Clean up file on process error
         fs.unlink(savedPath, (unlinkError) => {
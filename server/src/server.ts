@@ -3,6 +3,7 @@ import cors from 'cors';
 import dotenv from 'dotenv';
 import apiRoutes from './routes';
 import { uploadAudio, analyzeAudio } from './controllers';
+import { startAnalysisWorkers } from './utils/pythonAnalysis';
 
 // Load environment variables
 dotenv.config();
@@ -59,6 +60,7 @@ app.use('*', (req: Request, res: Response) => {
 app.listen(() => {
   const env = process.env.NODE_ENV || 'staging';
   console.log(`📍 Environment: ${env.charAt(0).toUpperCase() + env.slice(1)}`);
+  startAnalysisWorkers();
 });
 
 export default app;
@@ -57,8 +57,8 @@ AUDIO FEATURES:
 - Speech rate: ${features.speech_rate || 0} wpm
 - HNR (voice quality): ${features.hnr || 0} dB
 - Jitter: ${features.jitter || 0}
-- Shimmer: ${features.shimmer || 0}
-- Loudness: ${features.loudness || 0} dB
+- Shimmer: ${features.shimmer || 0} dB
+- Loudness: ${features.loudness || 0} sone (perceptual loudness)
 - Energy: ${features.energy_mean || 0}
 - Voice score: ${features.voice_quality_score || 0}/100
 
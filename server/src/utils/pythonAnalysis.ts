@@ -0,0 +1,211 @@
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { execFile, spawn, ChildProcessWithoutNullStreams } from 'child_process';
+
+export const analysisScriptPath = path.join(__dirname, '../../analyze_audio.py');
+
+export interface PythonAnalysisOutput {
+  code: number | null;
+  stdout: string;
+  stderr: string;
+}
+
+/**
+ * Send the file to the long-running Python analysis worker (analysis_server.py),
+ * which keeps the Whisper and openSMILE models loaded between requests
+ */
+const runWithAnalysisService = async (serviceUrl: string, filePath: string): Promise<PythonAnalysisOutput> => {
+  const audio = await fs.promises.readFile(filePath);
+  const form = new FormData();
+  form.append('audio', new Blob([audio]), path.basename(filePath));
+
+  const response = await fetch(`${serviceUrl.replace(/\/$/, '')}/analyze`, {
+    method: 'POST',
+    body: form
+  });
+  const body = await response.text();
+
+  return response.ok
+    ? { code: 0, stdout: body, stderr: '' }
+    : { code: response.status, stdout: '', stderr: body };
+};
+
+interface PendingAnalysis {
+  resolve: (output: PythonAnalysisOutput) => void;
+  reject: (error: Error) => void;
+}
+
+/**
+ * Long-lived `analyze_audio.py --serve` process; results come back one JSON line per file, in order
+ */
+class AnalysisWorker {
+  private child: ChildProcessWithoutNullStreams | null = null;
+  private pending: PendingAnalysis[] = [];
+  private stdoutBuffer = '';
+  private stderrBuffer = '';
+
+  constructor(private readonly scriptPath: string, private readonly cpuThreads: number) {}
+
+  get load(): number {
+    return this.pending.length;
+  }
+
+  start(): ChildProcessWithoutNullStreams {
+    if (this.child) {
+      return this.child;
+    }
+
+    // Split the cores between the workers so their CTranslate2 and FFT thread pools
+    // don't oversubscribe the CPU when several uploads are analyzed at once
+    const child = spawn('python3', [this.scriptPath, '--serve'], {
+      env: { ...process.env, PITCHPAL_CPU_THREADS: String(this.cpuThreads) }
+    });
+    child.stdout.setEncoding('utf8');
+    child.stderr.setEncoding('utf8');
+
+    child.stdout.on('data', (data: string) => {
+      this.stdoutBuffer += data;
+      let newline = this.stdoutBuffer.indexOf('\n');
+      while (newline !== -1) {
+        const line = this.stdoutBuffer.slice(0, newline);
+        this.stdoutBuffer = this.stdoutBuffer.slice(newline + 1);
+        this.pending.shift()?.resolve({ code: 0, stdout: line, stderr: this.stderrBuffer });
+        this.stderrBuffer = '';
+        newline = this.stdoutBuffer.indexOf('\n');
+      }
+    });
+
+    child.stderr.on('data', (data: string) => {
+      this.stderrBuffer += data;
+    });
+
+    // Fail everything in flight and let the next request start a fresh process
+    const handleFailure = (error: Error) => {
+      if (this.child === child) {
+        this.child = null;
+      }
+      const failed = this.pending;
+      this.pending = [];
+      this.stdoutBuffer = '';
+      this.stderrBuffer = '';
+      failed.forEach(request => request.reject(error));
+    };
+
+    child.on('error', handleFailure);
+    child.stdin.on('error', handleFailure);
+    child.on('exit', (code) => handleFailure(new Error(`Python analysis worker exited with code ${code}`)));
+
+    this.child = child;
+    return child;
+  }
+
+  analyze(filePath: string): Promise<PythonAnalysisOutput> {
+    return new Promise((resolve, reject) => {
+      const child = this.start();
+      this.pending.push({ resolve, reject });
+      child.stdin.write(`${filePath}\n`);
+    });
+  }
+}
+
+/**
+ * Ask analyze_audio.py which device Whisper will run on ("cuda" or "cpu")
+ */
+const detectWhisperDevice = (scriptPath: string): Promise<string> => {
+  return new Promise(resolve => {
+    execFile('python3', [scriptPath, '--device'], (error, stdout) => {
+      resolve(error ? 'cpu' : stdout.trim());
+    });
+  });
+};
+
+/**
+ * Each worker holds its own copy of the models, so keep the pool small: one process on
+ * a GPU (every extra one would open another CUDA context), otherwise one per core up to 4
+ */
+const resolveWorkerCount = async (scriptPath: string): Promise<number> => {
+  const configured = Number(process.env.ANALYSIS_WORKERS);
+  if (configured > 0) {
+    return configured;
+  }
+  const device = await detectWhisperDevice(scriptPath);
+  return device === 'cuda' ? 1 : Math.min(4, os.cpus().length);
+};
+
+let workers: Promise<AnalysisWorker[]> | null = null;
+
+const getWorkers = (scriptPath: string): Promise<AnalysisWorker[]> => {
+  if (!workers) {
+    workers = resolveWorkerCount(scriptPath).then(count => {
+      const cpuThreads = Math.max(1, Math.floor(os.cpus().length / count));
+      return Array.from({ length: count }, () => new AnalysisWorker(scriptPath, cpuThreads));
+    });
+  }
+  return workers;
+};
+
+/**
+ * Queue a file on the least busy persistent Python worker, which keeps the
+ * Whisper and openSMILE models loaded between uploads
+ */
+const runWithWorker = async (scriptPath: string, filePath: string): Promise<PythonAnalysisOutput> => {
+  const pool = await getWorkers(scriptPath);
+  const worker = pool.reduce((best, candidate) => candidate.load < best.load ? candidate : best);
+  return worker.analyze(filePath);
+};
+
+/**
+ * Start the persistent worker pool ahead of the first upload so the Python
+ * imports and model loads happen at server startup
+ */
+export const startAnalysisWorkers = (scriptPath: string = analysisScriptPath): void => {
+  if (process.env.ANALYSIS_SERVICE_URL || process.env.ANALYSIS_PERSISTENT_WORKER === 'false') {
+    return;
+  }
+  getWorkers(scriptPath).then(pool => pool.forEach(worker => worker.start()));
+};
+
+/**
+ * Run a fresh Python process for a single file
+ */
+const runWithScript = (scriptPath: string, filePath: string): Promise<PythonAnalysisOutput> => {
+  return new Promise((resolve, reject) => {
+    const pythonProcess = spawn('python3', [scriptPath, filePath]);
+
+    let stdout = '';
+    let stderr = '';
+
+    // Capture stdout
+    pythonProcess.stdout.on('data', (data) => {
+      stdout += data.toString();
+    });
+
+    // Capture stderr
+    pythonProcess.stderr.on('data', (data) => {
+      stderr += data.toString();
+    });
+
+    pythonProcess.on('close', (code) => resolve({ code, stdout, stderr }));
+    pythonProcess.on('error', reject);
+  });
+};
+
+/**
+ * Analyze an audio file with the Python pipeline.
+ * Uses the HTTP worker when ANALYSIS_SERVICE_URL is set, otherwise a pool of persistent
+ * analyze_audio.py child processes (or one process per file when ANALYSIS_PERSISTENT_WORKER=false).
+ * @param scriptPath - Path to analyze_audio.py
+ * @param filePath - Path to the uploaded audio file
+ * @returns Promise<PythonAnalysisOutput> - Exit code and captured output (JSON on stdout)
+ */
+export const runPythonAnalysis = (scriptPath: string, filePath: string): Promise<PythonAnalysisOutput> => {
+  const serviceUrl = process.env.ANALYSIS_SERVICE_URL;
+  if (serviceUrl) {
+    return runWithAnalysisService(serviceUrl, filePath);
+  }
+  if (process.env.ANALYSIS_PERSISTENT_WORKER === 'false') {
+    return runWithScript(scriptPath, filePath);
+  }
+  return runWithWorker(scriptPath, filePath);
+};
@@ -1,17 +1,15 @@
 #!/usr/bin/env python3
 
-import opensmile
 import sys
 
+from analyze_audio import get_smile
+
 def test_opensmile(file_path):
     try:
         print(f"Testing OpenSMILE with: {file_path}")
         
-        # Initialize openSMILE with ComParE feature set
-        smile = opensmile.Smile(
-            feature_set=opensmile.FeatureSet.ComParE_2016,
-            feature_level=opensmile.FeatureLevel.Functionals,
-        )
+        # Reuse the eGeMAPS extractor configured in analyze_audio.py
+        smile = get_smile()
         
         print("OpenSMILE initialized successfully")
         
@@ -19,27 +17,33 @@ def test_opensmile(file_path):
         features = smile.process_file(file_path)
         print(f"Features extracted: {features.shape}")
         
-        # Convert to dict for easier handling
-        feature_dict = features.to_dict('records')[0] if not features.empty else {}
-        print(f"Number of features: {len(feature_dict)}")
+        # Single row of features (a Series reads like a dict without copying every value)
+        feature_row = features.iloc[0] if not features.empty else {}
+        print(f"Number of features: {len(feature_row)}")
         
         # Check for specific features we need
         key_features = [
             "F0semitoneFrom27.5Hz_sma3nz_amean",
             "F0semitoneFrom27.5Hz_sma3nz_stddevNorm", 
+            "F0semitoneFrom27.5Hz_sma3nz_percentile20.0",
+            "F0semitoneFrom27.5Hz_sma3nz_percentile80.0",
             "loudness_sma3_amean",
+            "loudness_sma3_stddevNorm",
+            "loudness_sma3_pctlrange0-2",
             "jitterLocal_sma3nz_amean",
-            "HNRdBACF_sma3nz_amean"
+            "shimmerLocaldB_sma3nz_amean",
+            "HNRdBACF_sma3nz_amean",
+            "VoicedSegmentsPerSec"
         ]
         
         print("\nKey feature values:")
         for feature in key_features:
-            value = feature_dict.get(feature, "NOT_FOUND")
+            value = feature_row.get(feature, "NOT_FOUND")
             print(f"  {feature}: {value}")
             
         # Print first 10 features to see what we have
         print(f"\nFirst 10 features:")
-        for i, (key, value) in enumerate(feature_dict.items()):
+        for i, (key, value) in enumerate(feature_row.items()):
             if i >= 10:
                 break
             print(f"  {key}: {value}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Edge-case checks for spectral_centroid on the CPU and (when available) CUDA branches
+
+Run with: python -m pytest test_spectral_centroid.py
+"""
+
+import numpy as np
+import pytest
+
+import analyze_audio
+from analyze_audio import TARGET_SAMPLE_RATE, spectral_centroid
+
+requires_cuda = pytest.mark.skipif(
+    not analyze_audio._get_torch_cuda(), reason="torch with a CUDA device is not available"
+)
+
+@pytest.fixture
+def cpu_branch(monkeypatch):
+    # Force the scipy path even on a GPU host
+    monkeypatch.setattr(analyze_audio, "_TORCH_CUDA", False)
+
+def check_zero_signal():
+    centroid = spectral_centroid(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32), TARGET_SAMPLE_RATE)
+    assert centroid.size > 0
+    assert np.all(np.isfinite(centroid))
+    assert np.all(centroid == 0)
+
+def check_short_signal():
+    # Shorter than n_fft / 2: padded to a single frame rather than raising
+    y = np.sin(2 * np.pi * 440 * np.arange(500) / TARGET_SAMPLE_RATE).astype(np.float32)
+    centroid = spectral_centroid(y, TARGET_SAMPLE_RATE)
+    assert centroid.shape == (1,)
+    assert np.isfinite(centroid[0]) and centroid[0] > 0
+
+def test_zero_signal_cpu(cpu_branch):
+    check_zero_signal()
+
+def test_short_signal_cpu(cpu_branch):
+    check_short_signal()
+
+@requires_cuda
+def test_zero_signal_cuda():
+    check_zero_signal()
+
+@requires_cuda
+def test_short_signal_cuda():
+    check_short_signal()
+
+@requires_cuda
+def test_cuda_matches_cpu(monkeypatch):
+    rng = np.random.default_rng(0)
+    y = rng.standard_normal(3 * TARGET_SAMPLE_RATE).astype(np.float32)
+    gpu = spectral_centroid(y, TARGET_SAMPLE_RATE)
+    monkeypatch.setattr(analyze_audio, "_TORCH_CUDA", False)
+    cpu = spectral_centroid(y, TARGET_SAMPLE_RATE)
+    np.testing.assert_allclose(gpu, cpu, rtol=1e-3)